@@ -1,16 +1,182 @@
 from __future__ import annotations
 
-from typing import Optional, Union
-from functools import partial
+import asyncio
+import atexit
+import glob
+import inspect
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import cached_property, partial
 
 from serial.tools.list_ports import comports
-from rshell.pyboard import Pyboard
+from rshell.pyboard import Pyboard, PyboardError
 
 USB_VID = 0x0694
 USB_PID = 0x0010
 
+# Frequently used getters for Hub._eval_binary(), as (expression, format).
+# They are defined on the hub in advance, so they can be called with a short
+# command, _o(index).
+_OPS = [
+    ('(hub.battery.voltage(),)', '<i'),
+    ('(hub.battery.current(),)', '<i'),
+    ('(hub.battery.capacity_left(),)', '<i'),
+    ('hub.motion.accelerometer(False)', '<3i'),
+    ('hub.motion.accelerometer(True)', '<3i'),
+    ('hub.motion.gyroscope(False)', '<3i'),
+    ('hub.motion.gyroscope(True)', '<3i'),
+    ('hub.motion.yaw_pitch_roll()', '<3i'),
+]
+_OP_COMMANDS = {op: b'_o(%d)' % i for i, op in enumerate(_OPS)}
+
+# Methods which always return None. Hub._mcall() sends them without waiting
+# for the reply.
+_VOID_METHODS = {'pwm', 'float', 'brake', 'hold', 'preset', 'baud', 'write_direct'}
+
+# The strings of -100 to 100, the range of PWM values. See Hub._format_args().
+_PWM_STRS = [str(i) for i in range(-100, 101)]
+
+# _g() writes the values returned by get() as a count byte, followed by up to
+# _GET_MAX int32 values, padded to _GET_SIZE bytes. If the values can't be sent
+# like that, the count byte is 255, and their repr is printed after the padding.
+_GET_MAX = 8
+_GET_SIZE = 1 + 4 * _GET_MAX
+
+# Run on the hub after connecting. _b() and _o() are used by Hub._eval_binary(),
+# _sample() by Motion.sample(), _g() by Hub._get_values(), and _w() by
+# Motor.wait_until_done(). The functions which write raw bytes write b'B'
+# before them. See _Pyboard.exec_fast().
+_HUB_INIT = """\
+import hub, os, struct, sys, utime
+Image = hub.Image
+def _b(fmt, values):
+    sys.stdout.buffer.write(b'B' + struct.pack(fmt, *values))
+def _sample(f, n, period, *args):
+    buf = bytearray(1 + 6 * n)
+    buf[0] = 66
+    t = utime.ticks_ms()
+    for i in range(n):
+        struct.pack_into('<3h', buf, 1 + 6 * i, *f(*args))
+        t = utime.ticks_add(t, period)
+        utime.sleep_ms(max(0, utime.ticks_diff(t, utime.ticks_ms())))
+    sys.stdout.buffer.write(buf)
+_gb = bytearray(1 + %d)
+_gb[0] = 66
+def _g(v):
+    if type(v) is list and len(v) <= %d and all(
+            type(x) is int and -0x80000000 <= x <= 0x7fffffff for x in v):
+        _gb[1] = len(v)
+        struct.pack_into('<%%di' %% len(v), _gb, 2, *v)
+        sys.stdout.buffer.write(_gb)
+    else:
+        _gb[1] = 255
+        sys.stdout.buffer.write(_gb)
+        print(repr(v))
+def _w(m, ms):
+    t = utime.ticks_ms()
+    while m.busy(1):
+        if utime.ticks_diff(utime.ticks_ms(), t) >= ms:
+            return False
+        utime.sleep_ms(1)
+    return True
+def _o(i):
+    fmt, f = _d[i]
+    _b(fmt, f())
+_d = (
+""" % (_GET_SIZE, _GET_MAX) + ''.join(f'    ({fmt!r}, lambda: {expr}),\n' for expr, fmt in _OPS) + ')\n'
+
+
+def _find_device_linux() -> str | None:
+    # Read the USB IDs from sysfs, instead of letting comports() describe every serial port
+    for vid_path in glob.glob('/sys/bus/usb/devices/*/idVendor'):
+        dev_dir = os.path.dirname(vid_path)
+        try:
+            with open(vid_path) as f:
+                vid = int(f.read(), 16)
+            with open(os.path.join(dev_dir, 'idProduct')) as f:
+                pid = int(f.read(), 16)
+        except (OSError, ValueError):
+            continue
+        if vid == USB_VID and pid == USB_PID:
+            ttys = sorted(glob.glob(os.path.join(dev_dir, '*', 'tty', '*')))
+            if ttys:
+                return '/dev/' + os.path.basename(ttys[0])
+    return None
+
+
+def _find_device_windows() -> str | None:
+    # Only look at the registry entries of our USB IDs, instead of letting
+    # comports() query every serial port, which is slow for Bluetooth ports.
+    import winreg
+
+    hklm = winreg.HKEY_LOCAL_MACHINE
+    try:
+        with winreg.OpenKey(hklm, r'HARDWARE\DEVICEMAP\SERIALCOMM') as key:
+            present = {winreg.EnumValue(key, i)[1] for i in range(winreg.QueryInfoKey(key)[1])}
+        usb = winreg.OpenKey(hklm, r'SYSTEM\CurrentControlSet\Enum\USB')
+    except OSError:
+        return None
+    prefix = f'VID_{USB_VID:04X}&PID_{USB_PID:04X}'
+    with usb:
+        for i in range(winreg.QueryInfoKey(usb)[0]):
+            dev_name = winreg.EnumKey(usb, i)
+            if not dev_name.upper().startswith(prefix):
+                continue
+            with winreg.OpenKey(usb, dev_name) as dev:
+                for j in range(winreg.QueryInfoKey(dev)[0]):
+                    try:
+                        with winreg.OpenKey(dev, winreg.EnumKey(dev, j) + r'\Device Parameters') as params:
+                            port_name = winreg.QueryValueEx(params, 'PortName')[0]
+                    except OSError:
+                        continue
+                    if port_name in present:
+                        return port_name
+    return None
+
+
+def _find_device_by_ids() -> str | None:
+    if sys.platform.startswith('linux'):
+        return _find_device_linux()
+    elif sys.platform == 'win32':
+        return _find_device_windows()
+    else:
+        return None
+
+
+def _wait_for_device_udev(deadline: float | None) -> str | None:
+    import pyudev
+
+    monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+    monitor.filter_by('tty')
+    monitor.start()
+    # Check only after starting the monitor, so a device connected in between isn't missed
+    device = _find_device_linux()
+    vid, pid = f'{USB_VID:04x}', f'{USB_PID:04x}'
+    while device is None:
+        timeout = None if deadline is None else deadline - time.monotonic()
+        if timeout is not None and timeout <= 0:
+            break
+        event = monitor.poll(timeout)
+        if event is None:
+            break
+        props = event.properties
+        if event.action == 'add' and props.get('ID_VENDOR_ID') == vid and props.get('ID_MODEL_ID') == pid:
+            device = event.device_node
+    return device
+
 
 def find_device():
+    device = _find_device_by_ids()
+    if device is not None:
+        return device
+
     for port in comports():
         if port.vid == USB_VID and port.pid == USB_PID:
             return port.device
@@ -18,13 +184,273 @@ def find_device():
         raise RuntimeError("Couldn't find USB device")
 
 
+def _flush_at_exit(pb_ref):
+    # The timer that writes the commands kept by exec_nowait() runs in a
+    # daemon thread, so it may not get to run before the program exits.
+    pb = pb_ref()
+    if pb is not None and pb._lock.acquire(timeout=1):
+        try:
+            pb.flush()
+        finally:
+            pb._lock.release()
+
+
+class _Pyboard(Pyboard):
+    """
+    A Pyboard that stays in the raw REPL between commands.
+
+    Pyboard.exec_() waits for the '>' prompt before each command, and then
+    writes the command in chunks with a short sleep after each one. Since we
+    never leave the raw REPL, exec_fast() reads the prompt together with the
+    reply to the previous command, and writes each command in one go.
+
+    exec_nowait() writes a command without waiting for its reply. The replies
+    of such commands are read before the next command that needs a reply, so
+    consecutive commands whose result isn't needed don't wait for each other.
+    The commands are kept for up to write_delay seconds, so that commands
+    sent in quick succession are written together, in one USB packet.
+
+    The methods that communicate with the hub hold a lock, so a Hub may be
+    used from several threads.
+
+    If busy_poll is True, replies are waited for by checking repeatedly if
+    anything was received, instead of by a blocking read. This saves the time
+    it takes the OS to wake up the waiting thread, at the cost of keeping a
+    CPU core busy. After BUSY_POLL_TIME seconds without data, a blocking read
+    is used, so waiting for slow commands doesn't keep the CPU busy.
+    """
+    # How many commands may be written before their replies are read. This
+    # keeps the hub from blocking on writing replies that we don't read.
+    MAX_PENDING = 32
+    # Write the commands kept by exec_nowait() once they reach this size.
+    # This is the size of a full-speed USB packet.
+    WRITE_SIZE = 64
+    BUSY_POLL_TIME = 0.005
+
+    def __init__(self, *args, write_delay=0.003, busy_poll=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._busy_poll = busy_poll
+        self._lock = threading.RLock()
+        # Commands that were written, but whose replies weren't read yet,
+        # each with the Future that should get its output, or None
+        self._pending: deque[tuple[bytes, Future | None]] = deque()
+        # Commands from exec_nowait() that weren't written yet, and the timer
+        # that will write them
+        self._write_delay = write_delay
+        self._wbuf = bytearray()
+        self._write_timer = None
+        atexit.register(_flush_at_exit, weakref.ref(self))
+        # Bytes that were read from the serial port, but weren't consumed yet
+        self._rx = bytearray()
+        if hasattr(self.serial, 'set_buffer_size'):
+            # Only on Windows. The default input buffer is 4096 bytes.
+            self.serial.set_buffer_size(rx_size=65536)
+
+    def read_until(self, min_num_bytes, ending, timeout=10, data_consumer=None):
+        # Pyboard.read_until() reads one byte at a time, and polls every 10ms
+        # when there's nothing to read. Instead, read everything that is
+        # available, and let serial.read() wait for more. bytearray.find() scans
+        # in C, and each byte is scanned once, even if the reply arrives in
+        # many small reads.
+        start = 0
+        while True:
+            i = self._rx.find(ending, start)
+            if i >= 0:
+                data = self._consume(i + len(ending))
+                break
+            # The ending may begin at the last bytes which were already scanned
+            start = max(0, len(self._rx) - len(ending) + 1)
+            if not self._read_available(timeout):
+                data = self._consume(len(self._rx))
+                break
+        if data_consumer:
+            data_consumer(data)
+        return data
+
+    def _read_exact(self, n, timeout=10) -> bytes:
+        while len(self._rx) < n:
+            if not self._read_available(timeout):
+                raise PyboardError('timeout waiting for reply')
+        return self._consume(n)
+
+    def _read_available(self, timeout) -> bool:
+        """
+        Read everything available, waiting up to timeout seconds for at least
+        one byte. Return whether anything was read.
+        """
+        n = self.serial.inWaiting()
+        if n == 0 and self._busy_poll:
+            deadline = time.monotonic() + (
+                self.BUSY_POLL_TIME if timeout is None else min(self.BUSY_POLL_TIME, timeout))
+            while n == 0 and time.monotonic() < deadline:
+                # Let other threads run, without waiting for the OS
+                time.sleep(0)
+                n = self.serial.inWaiting()
+        if self.serial.timeout != timeout:
+            self.serial.timeout = timeout
+        data = self.serial.read(n or 1)
+        self._rx += data
+        return len(data) > 0
+
+    def _consume(self, n) -> bytes:
+        data = bytes(self._rx[:n])
+        del self._rx[:n]
+        return data
+
+    def enter_raw_repl(self):
+        super().enter_raw_repl()
+        data = self.read_until(1, b'>')
+        if not data.endswith(b'>'):
+            raise PyboardError('could not enter raw repl')
+
+    def exec_fast(self, command, nbytes=0, timeout=10) -> bytes:
+        """
+        Execute a command and return its output.
+
+        If nbytes is given, the command should write b'B', followed by nbytes
+        which are read as is. This allows the output to include any bytes,
+        including b'\\x04'. If the command raises an exception before writing
+        anything, PyboardError is raised as usual.
+        """
+        with self._lock:
+            self.sync()
+            self._write_command(command)
+            ret, ret_err = self._read_reply(nbytes, timeout)
+        if ret_err:
+            raise PyboardError('exception', ret, ret_err)
+        return ret
+
+    def exec_nowait(self, command, no_delay=False, future: Future | None = None):
+        """
+        Execute a command without reading its reply.
+
+        Unless no_delay is True, the command may be written a few milliseconds
+        later, together with the following commands.
+
+        If future is given, it gets the output of the command when its reply is
+        read. Otherwise, if the command raises an exception, the next call to
+        sync() raises it.
+        """
+        with self._lock:
+            if len(self._pending) >= self.MAX_PENDING:
+                self.sync()
+            if isinstance(command, str):
+                command = command.encode('utf8')
+            self._wbuf += command + b'\x04'
+            self._pending.append((command, future))
+            if no_delay or len(self._wbuf) >= self.WRITE_SIZE or self._write_delay <= 0:
+                self.flush()
+            elif self._write_timer is None:
+                self._write_timer = threading.Timer(self._write_delay, self.flush)
+                self._write_timer.daemon = True
+                self._write_timer.start()
+
+    def flush(self):
+        """
+        Write the commands kept by exec_nowait().
+        """
+        with self._lock:
+            if self._write_timer is not None:
+                self._write_timer.cancel()
+                self._write_timer = None
+            if self._wbuf:
+                self.serial.write(bytes(self._wbuf))
+                self._wbuf.clear()
+
+    def sync(self):
+        """
+        Read the replies of all the commands written by exec_nowait().
+
+        If one of them raised an exception, and it has no future, raise
+        PyboardError.
+        """
+        with self._lock:
+            self.flush()
+            while self._pending:
+                _command, future = self._pending.popleft()
+                try:
+                    ret, ret_err = self._read_reply()
+                except PyboardError as e:
+                    if future is not None:
+                        future.set_exception(e)
+                    raise
+                if future is not None:
+                    if ret_err:
+                        future.set_exception(PyboardError('exception', ret, ret_err))
+                    else:
+                        future.set_result(ret)
+                elif ret_err:
+                    raise PyboardError('exception', ret, ret_err)
+
+    def _write_command(self, command):
+        if isinstance(command, str):
+            command = command.encode('utf8')
+        self.serial.write(command + b'\x04')
+
+    def _read_reply(self, nbytes=0, timeout=10) -> (bytes, bytes):
+        try:
+            if self._read_exact(2) != b'OK':
+                raise PyboardError('could not exec command')
+            raw = b''
+            if nbytes:
+                mark = self._read_exact(1, timeout)
+                if mark == b'B':
+                    raw = self._read_exact(nbytes, timeout)
+                else:
+                    # The output is empty, probably because of an exception
+                    self._rx[:0] = mark
+            data = self.read_until(1, b'\x04>', timeout)
+            if not data.endswith(b'\x04>'):
+                raise PyboardError('timeout waiting for reply')
+        except PyboardError:
+            self._resync()
+            raise
+        ret, ret_err = data[:-2].split(b'\x04', 1)
+        return raw + ret, ret_err
+
+    def _resync(self):
+        """
+        After a reply wasn't read as expected, interrupt the command if it's
+        still running, and skip everything up to the reply of a new command.
+        This way, the next reply that is read belongs to the next command.
+        """
+        self._rx.clear()
+        # Their replies are skipped too
+        while self._pending:
+            _command, future = self._pending.popleft()
+            if future is not None:
+                future.set_exception(PyboardError('the reply was lost'))
+        token = b'resync%d' % time.monotonic_ns()
+        self.serial.write(b'\x03print("' + token + b'")\x04')
+        self.read_until(1, token + b'\r\n\x04\x04>')
+
+
 class Hub:
-    def __init__(self, device: Optional[str] = None):
+    def __init__(self, device: str | None = None, write_delay: float = 0.003,
+                 busy_poll: bool = False):
+        # write_delay is how many seconds calls that don't return a value may
+        # wait, so that they will be sent together with the following calls.
+        # busy_poll makes waiting for replies faster, but keeps a CPU core
+        # busy while waiting. See _Pyboard.
         if device is None:
             device = find_device()
-        self._pb = Pyboard(device)
+        self._pb = _Pyboard(device, write_delay=write_delay, busy_poll=busy_poll)
         self._pb.enter_raw_repl()
-        self._pb.exec_('import hub; Image = hub.Image; import os')
+        # Get a few things that we will need anyway with the same round-trip.
+        # This also fills the cached properties __version__ and config.
+        b = self._pb.exec_fast(
+            _HUB_INIT + "print(repr((hub.__version__, hub.config, hasattr(hub, 'supervision'))))")
+        self.__version__, self.config, has_supervision = eval(b)
+
+        # Maps an expression to the time it was evaluated and its value.
+        # See _eval_cached().
+        self._cache: dict[str, tuple[float, object]] = {}
+        # Maps (name, method) to the start of the call. See _format_mcall().
+        self._prefixes: dict[tuple[str, str], str] = {}
+        # Maps the devices and format given to sample() to the expression
+        self._sample_exprs: dict[tuple[tuple[str, ...], int | None], str] = {}
+        # Holds the active _Batch of each thread, if any
+        self._local = threading.local()
 
         self.battery = Battery(self, 'hub.battery')
         self.bluetooth = Bluetooth(self, 'hub.bluetooth')
@@ -33,29 +459,331 @@ class Hub:
         self.motion = Motion(self, 'hub.motion')
         self.port = Ports(self, 'hub.port')
         self.sound = Sound(self, 'hub.sound')
-        self.supervision = Supervision(self, 'hub.supervision')
+        # Older firmware versions don't have it
+        self.supervision = Supervision(self, 'hub.supervision') if has_supervision else None
 
         self.Image = Image
 
         # This is not in the original hub class, but useful
         self.os = Os(self)
 
+    @staticmethod
+    def wait_for_device(timeout: float | None = None) -> str:
+        """
+        Waits until the hub is connected with USB.
+
+        This first checks with find_device(). Then, on Linux, it waits for a
+        udev event, and elsewhere it checks every 100 milliseconds.
+
+        Parameters:
+        timeout – How many seconds to wait. None means to wait forever.
+
+        Returns:
+        The device, which can be passed to Hub().
+
+        Raises:
+        TimeoutError – If the hub wasn't connected before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # The quick checks below only look for our USB IDs, so first also let
+        # find_device() fall back to comports()
+        try:
+            return find_device()
+        except RuntimeError:
+            pass
+        if sys.platform.startswith('linux'):
+            device = _wait_for_device_udev(deadline)
+        else:
+            while True:
+                if sys.platform == 'win32':
+                    device = _find_device_windows()
+                else:
+                    try:
+                        device = find_device()
+                    except RuntimeError:
+                        device = None
+                if device is not None or (deadline is not None and time.monotonic() >= deadline):
+                    break
+                time.sleep(0.1)
+        if device is None:
+            raise TimeoutError("The hub wasn't connected")
+        return device
+
     def close(self):
-        self._pb.close()
+        """
+        Sends the calls that weren't sent yet, waits for their replies, and
+        closes the connection.
+
+        Calls that don't return a value may wait a few milliseconds before they
+        are sent. When the program exits they are sent anyway, but if you
+        stop using the hub earlier, call close().
+
+        Raises:
+        PyboardError – If one of the calls that don't return a value raised an
+            exception on the hub. The connection is closed anyway.
+        """
+        try:
+            self._pb.sync()
+        finally:
+            self._pb.exit_raw_repl()
+            self._pb.close()
+
+    def _current_batch(self) -> _Batch | None:
+        return getattr(self._local, 'batch', None)
 
     def _eval(self, expr):
-        b = self._pb.exec_(f'print(repr({expr}))')
+        batch = self._current_batch()
+        if batch is not None:
+            return batch.add(expr)
+        b = self._pb.exec_fast(f'print(repr({expr}))')
         return eval(b)
 
+    def _eval_cached(self, expr, ttl: float):
+        """
+        Like _eval, but if the expression was evaluated less than ttl seconds
+        ago, return the previous value.
+        """
+        if self._current_batch() is not None:
+            return self._eval(expr)
+        now = time.monotonic()
+        cached = self._cache.get(expr)
+        if cached is not None and now - cached[0] < ttl:
+            return cached[1]
+        value = self._eval(expr)
+        self._cache[expr] = now, value
+        return value
+
+    def invalidate_cache(self):
+        """
+        Forgets all cached values, so they will be read again from the hub.
+        """
+        self._cache.clear()
+        for name in ('__version__', 'config'):
+            self.__dict__.pop(name, None)
+
+    def _eval_binary(self, expr, fmt: str) -> tuple:
+        """
+        Evaluate an expression which returns a sequence of numbers, and get them
+        packed by struct using the given format. This is quicker to transfer
+        and to parse than their repr.
+        """
+        if self._current_batch() is not None:
+            return self._eval(expr)
+        command = _OP_COMMANDS.get((expr, fmt)) or f'_b({fmt!r}, {expr})'
+        b = self._pb.exec_fast(command, struct.calcsize(fmt))
+        return struct.unpack(fmt, b)
+
+    def _eval_many(self, exprs):
+        # A trailing comma makes sure that a single expression is still a tuple
+        return self._eval(f"({''.join(expr + ', ' for expr in exprs)})")
+
+    def _get_values(self, name, args, kwargs) -> list:
+        """
+        Call get() of a device or a motor. Usually, the values are all ints, so
+        they are sent packed by struct, which is quicker to transfer and to
+        parse than their repr.
+        """
+        expr = self._format_mcall(name, 'get', args, kwargs)
+        if self._current_batch() is not None:
+            return self._eval(expr)
+        b = self._pb.exec_fast(f'_g({expr})', _GET_SIZE)
+        n = b[0]
+        if n == 255:
+            return eval(b[_GET_SIZE:])
+        return list(struct.unpack_from(f'<{n}i', b, 1))
+
+    @staticmethod
+    def _format_call(name, args, kwargs):
+        return Hub._format_args(f'{name}(', args, kwargs)
+
+    @staticmethod
+    def _format_args(prefix, args, kwargs):
+        if not kwargs and len(args) == 1 and type(args[0]) is int:
+            # The common calls with one int argument, like pwm() and value()
+            value = args[0]
+            if -100 <= value <= 100:
+                return prefix + _PWM_STRS[value + 100] + ')'
+            return f'{prefix}{value})'
+        parts = [repr(arg) for arg in args]
+        if kwargs:
+            parts += [f'{k}={v!r}' for k, v in kwargs.items()]
+        return f"{prefix}{', '.join(parts)})"
+
+    def _format_mcall(self, name, method, args, kwargs):
+        # The prefix, like 'hub.port.A.motor.pwm(', is built once for each
+        # object and method
+        try:
+            prefix = self._prefixes[name, method]
+        except KeyError:
+            prefix = self._prefixes[name, method] = f'{name}.{method}('
+        return self._format_args(prefix, args, kwargs)
+
     def _call(self, name, *args, **kwargs):
-        parts = [repr(arg) for arg in args] + [f'{k}={v!r}' for k, v in kwargs.items()]
-        expr = f"{name}({', '.join(parts)})"
-        return self._eval(expr)
+        return self._eval(self._format_call(name, args, kwargs))
 
     def _mcall(self, name, method, *args, **kwargs):
-        return self._call(f'{name}.{method}', *args, **kwargs)
+        expr = self._format_mcall(name, method, args, kwargs)
+        if method in _VOID_METHODS:
+            return self._exec_nowait(expr, False)
+        return self._eval(expr)
 
-    @property
+    def _call_nowait(self, name, *args, no_delay=False, **kwargs):
+        """
+        Like _call, for calls which always return None. This doesn't wait for
+        the call to complete. An exception raised by it will be raised by the
+        next call that does wait.
+
+        Unless no_delay is True, the call may be sent a few milliseconds later,
+        together with the following calls.
+        """
+        return self._exec_nowait(self._format_call(name, args, kwargs), no_delay)
+
+    def _mcall_nowait(self, name, method, *args, no_delay=False, **kwargs):
+        return self._exec_nowait(self._format_mcall(name, method, args, kwargs), no_delay)
+
+    def _exec_nowait(self, expr, no_delay) -> BatchResult | None:
+        batch = self._current_batch()
+        if batch is not None:
+            return batch.add(expr)
+        self._pb.exec_nowait(expr, no_delay)
+        return None
+
+    async def _mcall_async(self, name, method, *args, **kwargs):
+        """
+        Like _mcall, but doesn't block the event loop. The replies of calls that
+        were sent together are read together, so awaiting several calls
+        concurrently takes a single round-trip.
+
+        The serial port is only used from threads of the default executor, so
+        that the event loop doesn't wait for the lock.
+        """
+        if self._current_batch() is not None:
+            raise RuntimeError("Async calls can't be made inside a batch")
+        expr = self._format_mcall(name, method, args, kwargs)
+        future = Future()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            None, partial(self._pb.exec_nowait, f'print(repr({expr}))', future=future))
+        await loop.run_in_executor(None, self._pb.sync)
+        return eval(future.result())
+
+    # The _fastcall methods get a bytes template of a call with a %d for each
+    # argument, prepared in advance, to avoid formatting and encoding the call
+    # every time. All the arguments must be of type int.
+
+    def _fastcall_int(self, template: bytes, *ints):
+        if self._current_batch() is not None:
+            return self._eval((template % ints).decode())
+        return eval(self._pb.exec_fast(b'print(repr(' + template % ints + b'))'))
+
+    def _fastcall_int_nowait(self, template: bytes, *ints) -> BatchResult | None:
+        batch = self._current_batch()
+        if batch is not None:
+            return batch.add((template % ints).decode())
+        self._pb.exec_nowait(template % ints)
+        return None
+
+    def batch(self, *exprs: str):
+        """
+        batch() -> context manager
+        batch(*exprs: str) -> tuple
+
+        Makes several calls using a single round-trip.
+
+        With no arguments, returns a context manager. Calls made inside the
+        with block are collected instead of being sent, and return a
+        BatchResult. When the block ends, all the calls are made in order
+        using a single command, and the value of each BatchResult is set:
+
+            with hub.batch():
+                hub.port.A.motor.mode([(1, 0), (2, 0)])
+                hub.port.A.motor.default(speed=50)
+                voltage = hub.battery.voltage()
+            print(voltage.value)
+
+        If one of the calls raises an exception, the calls after it aren't
+        made, and no value is set. Motor.pair(), Motor.wait_until_done() and
+        Motion.sample() can't be used inside the block.
+
+        Parameters:
+        exprs – Expressions to evaluate, using the names available on the hub,
+            for example 'hub.battery.voltage()'.
+
+        Returns:
+        If expressions are given, a tuple with the value of each expression.
+        """
+        if exprs:
+            return self._eval_many(exprs)
+        return _Batch(self)
+
+    def sample(self, devices: list[Device | Motor], format: int | None = None) -> list:
+        """
+        Gets the values of several devices or motors using a single round-trip.
+
+        Parameters:
+        devices – The devices or motors, for example
+            [hub.port.A.motor, hub.port.B.motor, hub.port.C.device].
+        format – Passed to get(). Choose FORMAT_RAW, FORMAT_PCT, or FORMAT_SI.
+
+        Returns:
+        A list with the result of get() of each device.
+        """
+        # noinspection PyProtectedMember
+        key = tuple(device._me for device in devices), format
+        expr = self._sample_exprs.get(key)
+        if expr is None:
+            get = '.get()' if format is None else f'.get({format!r})'
+            expr = self._sample_exprs[key] = f"[{', '.join(me + get for me in key[0])}]"
+        return self._eval(expr)
+
+    def preset_all(self, presets: list[tuple[Motor | MotorPair, int | tuple[int, int]]]) -> None:
+        """
+        Presets the starting positions of several motors or motor pairs using a
+        single round-trip.
+
+        Parameters:
+        presets – A list of (motor, position) or (pair, (position_0, position_1)).
+            See Motor.preset and MotorPair.preset.
+        """
+        self._call_all('preset', presets)
+
+    def run_to_position_all(self, targets: list[tuple[Motor | MotorPair, int | tuple[int, int]]],
+                            **kwargs) -> None:
+        """
+        Runs several motors or motor pairs to the given positions using a
+        single round-trip.
+
+        Parameters:
+        targets – A list of (motor, position) or (pair, (position_0, position_1)).
+
+        Keyword Arguments:
+        Passed to every Motor.run_to_position or MotorPair.run_to_position call.
+        """
+        self._call_all('run_to_position', targets, **kwargs)
+
+    def brake_all(self, motors: list[Motor | MotorPair]) -> None:
+        """
+        Passively brakes several motors or motor pairs using a single round-trip.
+        """
+        self._call_all('brake', [(motor, ()) for motor in motors])
+
+    def hold_all(self, motors: list[Motor | MotorPair]) -> None:
+        """
+        Actively holds several motors or motor pairs in their current position
+        using a single round-trip.
+        """
+        self._call_all('hold', [(motor, ()) for motor in motors])
+
+    def _call_all(self, method, items, **kwargs):
+        # Use the active batch, if there is one
+        batch = _Batch(self) if self._current_batch() is None else nullcontext()
+        with batch:
+            for obj, args in items:
+                if not isinstance(args, tuple):
+                    args = (args,)
+                getattr(obj, method)(*args, **kwargs)
+
+    @cached_property
     def __version__(self):
         """
         The firmware version of the form 'v1.0.06.0034-b0c335b', consisting of the components:
@@ -64,7 +792,7 @@ class Hub:
         """
         return self._eval('hub.__version__')
 
-    @property
+    @cached_property
     def config(self):
         return self._eval('hub.config')
 
@@ -129,7 +857,7 @@ class Hub:
 
         Tuple mode. This works just like RGB mode, but you can provide all three values in a single tuple.
         """
-        self._call('hub.led', *args, **kwargs)
+        return self._call_nowait('hub.led', *args, **kwargs)
 
     # The top of the hub. This is the side with the matrix display.
     TOP = 0
@@ -150,6 +878,119 @@ class Hub:
     LEFT = 5
 
 
+class AsyncHub:
+    """
+    An asyncio interface to the hub.
+
+    It has the same attributes as Hub, but methods and properties return
+    awaitables instead of results:
+
+        hub = AsyncHub()
+        voltage = await hub.battery.voltage()
+        await hub.port.A.motor.run_for_degrees(90)
+
+    The calls are run by a background thread, one after the other, in the
+    order they were made. The event loop can do other things while waiting
+    for the hub.
+
+    Keyword arguments, like write_delay and busy_poll, are passed to Hub.
+    """
+    def __init__(self, device: str | None = None, **kwargs):
+        self.hub = Hub(device, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def close(self):
+        self._executor.shutdown()
+        self.hub.close()
+
+    def __getattr__(self, name):
+        return _AsyncProxy(self.hub, self._executor).__getattr__(name)
+
+
+class _AsyncProxy:
+    def __init__(self, obj, executor: ThreadPoolExecutor):
+        self._obj = obj
+        self._executor = executor
+
+    def _run(self, func):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func)
+
+    def __getattr__(self, name):
+        if isinstance(getattr(type(self._obj), name, None), (property, cached_property)):
+            return self._run(lambda: getattr(self._obj, name))
+        attr = getattr(self._obj, name)
+        if isinstance(attr, type) or inspect.iscoroutinefunction(attr):
+            return attr
+        elif callable(attr):
+            return lambda *args, **kwargs: self._run(lambda: attr(*args, **kwargs))
+        elif type(attr).__module__ == __name__:
+            return _AsyncProxy(attr, self._executor)
+        else:
+            return attr
+
+    def __repr__(self):
+        return repr(self._obj)
+
+
+class BatchResult:
+    """
+    The result of a call made inside a Hub.batch() block.
+
+    Its value is available after the block ends.
+    """
+    _NOT_SET = object()
+
+    def __init__(self, source: BatchResult | None = None, key=None):
+        # If source is given, this is the result of source.value[key]
+        self._source = source
+        self._key = key
+        self._value = self._NOT_SET
+
+    @property
+    def value(self):
+        if self._source is not None:
+            return self._source.value[self._key]
+        if self._value is self._NOT_SET:
+            raise RuntimeError("The batch wasn't run yet")
+        return self._value
+
+    def __getitem__(self, key) -> BatchResult:
+        return BatchResult(self, key)
+
+    def __repr__(self):
+        try:
+            return f'<BatchResult {self.value!r}>'
+        except RuntimeError:
+            return '<BatchResult (not run yet)>'
+
+
+# noinspection PyProtectedMember
+class _Batch:
+    def __init__(self, hub: Hub):
+        self._hub = hub
+        self._exprs = []
+        self._results = []
+
+    def add(self, expr: str) -> BatchResult:
+        result = BatchResult()
+        self._exprs.append(expr)
+        self._results.append(result)
+        return result
+
+    def __enter__(self):
+        if self._hub._current_batch() is not None:
+            raise RuntimeError("Hub.batch() blocks can't be nested")
+        self._hub._local.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._hub._local.batch = None
+        if exc_type is None and self._exprs:
+            values = self._hub._eval(f"[{', '.join(self._exprs)}]")
+            for result, value in zip(self._results, values):
+                result._value = value
+
+
 # noinspection PyProtectedMember
 class Battery:
     def __init__(self, hub: Hub, me: str):
@@ -163,7 +1004,7 @@ class Battery:
         Returns:
         The voltage in in mV.
         """
-        return self._hub._mcall(self._me, 'voltage')
+        return self._hub._eval_binary(f'({self._me}.voltage(),)', '<i')[0]
 
     def current(self) -> int:
         """
@@ -172,7 +1013,7 @@ class Battery:
         Returns:
         The current in in mA.
         """
-        return self._hub._mcall(self._me, 'current')
+        return self._hub._eval_binary(f'({self._me}.current(),)', '<i')[0]
 
     def capacity_left(self) -> int:
         """
@@ -181,7 +1022,7 @@ class Battery:
         Returns:
         The remaining battery capacity.
         """
-        return self._hub._mcall(self._me, 'capacity_left')
+        return self._hub._eval_binary(f'({self._me}.capacity_left(),)', '<i')[0]
 
     def temperature(self) -> float:
         """
@@ -192,7 +1033,7 @@ class Battery:
         """
         return self._hub._mcall(self._me, 'temperature')
 
-    def charger_detect(self) -> Union[bool, int]:
+    def charger_detect(self) -> bool | int:
         """
         Checks what type of charger was detected.
 
@@ -202,6 +1043,19 @@ class Battery:
         """
         return self._hub._mcall(self._me, 'charger_detect')
 
+    def snapshot(self) -> (int, int, int, float):
+        """
+        Gets the voltage, current, remaining capacity and temperature of the
+        battery using a single round-trip.
+
+        Returns:
+        A tuple of (voltage, current, capacity_left, temperature), with the same
+        units as the individual methods.
+        """
+        return self._hub._eval_many([
+            f'{self._me}.voltage()', f'{self._me}.current()',
+            f'{self._me}.capacity_left()', f'{self._me}.temperature()'])
+
     def info(self) -> dict:
         """
         Gets status information about the battery.
@@ -284,6 +1138,9 @@ class Battery:
 
 # noinspection PyProtectedMember
 class Bluetooth:
+    # info() is cached for this many seconds
+    INFO_TTL = 60.0
+
     def __init__(self, hub: Hub, me: str):
         self._hub = hub
         self._me = me
@@ -338,8 +1195,11 @@ class Bluetooth:
         Returns:
         Bluetooth subsystem information dictionary similar to the example above,
         or None if the Bluetooth subsystem is not running.
+
+        The result is cached for INFO_TTL seconds. Use Hub.invalidate_cache()
+        to read it again sooner.
         """
-        return self._hub._mcall(self._me, 'info')
+        return self._hub._eval_cached(f'{self._me}.info()', self.INFO_TTL)
 
     def forget(self, address: str) -> bool:
         """
@@ -351,7 +1211,10 @@ class Bluetooth:
         Returns:
         True if a valid address was given, or False if not.
         """
-        return self._hub._mcall(self._me, 'forget', address)
+        r = self._hub._mcall(self._me, 'forget', address)
+        # info() includes the known devices
+        self._hub._cache.pop(f'{self._me}.info()', None)
+        return r
 
     def lwp_advertise(self, *args, **kwargs):
         """
@@ -430,9 +1293,31 @@ class Button:
         return self._hub._mcall(self._me, 'presses')
 
 
-class Image:
-    def __init__(self, string_or_width: Union[str, int, list],
-                 height: Optional[int] = None, buffer: Optional[bytes] = None):
+# Translates ASCII digits to their values
+_DIGIT_VALUES = bytes.maketrans(b'0123456789', bytes(range(10)))
+
+
+class _ImageMeta(type):
+    # The built-in images are created when first used, and then stored as
+    # class attributes.
+
+    def __getattr__(cls, name):
+        if name in _IMAGES:
+            value = cls(5, 5, _IMAGES[name].encode('ascii').translate(_DIGIT_VALUES, b':'))
+        elif name in _IMAGE_GROUPS:
+            value = tuple(getattr(cls, image_name) for image_name in _IMAGE_GROUPS[name])
+        else:
+            raise AttributeError(f"type object {cls.__name__!r} has no attribute {name!r}")
+        setattr(cls, name, value)
+        return value
+
+    def __dir__(cls):
+        return sorted(set(super().__dir__()) | set(_IMAGES) | set(_IMAGE_GROUPS))
+
+
+class Image(metaclass=_ImageMeta):
+    def __init__(self, string_or_width: str | int | list,
+                 height: int | None = None, buffer: bytes | None = None):
         if isinstance(string_or_width, list):
             assert height is None and buffer is None
             self.pixels = string_or_width
@@ -448,7 +1333,8 @@ class Image:
             else:
                 if len(buffer) != width * height:
                     raise ValueError("buffer length must be width*height")
-            self.pixels = [[buffer[i * width + j] for j in range(width)] for i in range(height)]
+            # Slice each row, instead of indexing every byte
+            self.pixels = [list(buffer[i * width:(i + 1) * width]) for i in range(height)]
 
     @staticmethod
     def _parse_string(s):
@@ -456,11 +1342,21 @@ class Image:
             rows = s.split(':')
         else:
             rows = s.split('\n')
-        pixels = [[int(c) for c in row.strip()] for row in rows if row.strip()]
+        rows = [row.strip() for row in rows]
+        if not all(row.isdigit() for row in rows if row):
+            raise ValueError("Image rows must consist of digits")
+        # Translate each row at once, instead of calling int() for every pixel
+        pixels = [list(row.encode('ascii').translate(_DIGIT_VALUES)) for row in rows if row]
         if not all(len(row) == len(pixels[0]) for row in pixels):
             raise ValueError("Not all rows have equal width")
         return pixels
 
+    def __getattr__(self, name):
+        # Built-in images which weren't created by _ImageMeta yet
+        if name in _IMAGES or name in _IMAGE_GROUPS:
+            return getattr(type(self), name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
     def width(self):
         return len(self.pixels[0])
 
@@ -470,9 +1366,14 @@ class Image:
     def shift(self, x: int, y: int):
         w = self.width()
         h = self.height()
-        return Image([[(self.pixels[y0 + y][x0 + x] if (0 <= y0 + y < h and 0 <= x0 + x < w) else 0)
-                       for x0 in range(w)]
-                      for y0 in range(h)])
+        # Compute the region that stays visible once, and copy it with slices
+        # into an empty image, instead of checking the bounds of every pixel
+        src_x, dst_x, nx = max(x, 0), max(-x, 0), max(w - abs(x), 0)
+        src_y, dst_y, ny = max(y, 0), max(-y, 0), max(h - abs(y), 0)
+        pixels = [[0] * w for _ in range(h)]
+        for i in range(ny):
+            pixels[dst_y + i][dst_x:dst_x + nx] = self.pixels[src_y + i][src_x:src_x + nx]
+        return Image(pixels)
 
     def shift_left(self, n: int):
         return self.shift(n, 0)
@@ -500,80 +1401,84 @@ class Image:
         return f'Image({s!r})'
 
 
-Image.ANGRY = Image('90009:09090:00000:99999:90909:')
-Image.ARROW_E = Image('00900:00090:99999:00090:00900:')
-Image.ARROW_N = Image('00900:09990:90909:00900:00900:')
-Image.ARROW_NE = Image('00999:00099:00909:09000:90000:')
-Image.ARROW_NW = Image('99900:99000:90900:00090:00009:')
-Image.ARROW_S = Image('00900:00900:90909:09990:00900:')
-Image.ARROW_SE = Image('90000:09000:00909:00099:00999:')
-Image.ARROW_SW = Image('00009:00090:90900:99000:99900:')
-Image.ARROW_W = Image('00900:09000:99999:09000:00900:')
-Image.ASLEEP = Image('00000:99099:00000:09990:00000:')
-Image.BUTTERFLY = Image('99099:99999:00900:99999:99099:')
-Image.CHESSBOARD = Image('09090:90909:09090:90909:09090:')
-Image.CLOCK1 = Image('00090:00090:00900:00000:00000:')
-Image.CLOCK2 = Image('00000:00099:00900:00000:00000:')
-Image.CLOCK3 = Image('00000:00000:00999:00000:00000:')
-Image.CLOCK4 = Image('00000:00000:00900:00099:00000:')
-Image.CLOCK5 = Image('00000:00000:00900:00090:00090:')
-Image.CLOCK6 = Image('00000:00000:00900:00900:00900:')
-Image.CLOCK7 = Image('00000:00000:00900:09000:09000:')
-Image.CLOCK8 = Image('00000:00000:00900:99000:00000:')
-Image.CLOCK9 = Image('00000:00000:99900:00000:00000:')
-Image.CLOCK10 = Image('00000:99000:00900:00000:00000:')
-Image.CLOCK11 = Image('09000:09000:00900:00000:00000:')
-Image.CLOCK12 = Image('00900:00900:00900:00000:00000:')
-Image.CONFUSED = Image('00000:09090:00000:09090:90909:')
-Image.COW = Image('90009:90009:99999:09990:00900:')
-Image.DIAMOND = Image('00900:09090:90009:09090:00900:')
-Image.DIAMOND_SMALL = Image('00000:00900:09090:00900:00000:')
-Image.DUCK = Image('09900:99900:09999:09990:00000:')
-Image.FABULOUS = Image('99999:99099:00000:09090:09990:')
-Image.GHOST = Image('99999:90909:99999:99999:90909:')
-Image.GIRAFFE = Image('99000:09000:09000:09990:09090:')
-Image.GO_DOWN = Image('00000:99999:09990:00900:00000:')
-Image.GO_LEFT = Image('00090:00990:09990:00990:00090:')
-Image.GO_RIGHT = Image('09000:09900:09990:09900:09000:')
-Image.GO_UP = Image('00000:00900:09990:99999:00000:')
-Image.HAPPY = Image('00000:09090:00000:90009:09990:')
-Image.HEART = Image('09090:99999:99999:09990:00900:')
-Image.HEART_SMALL = Image('00000:09090:09990:00900:00000:')
-Image.HOUSE = Image('00900:09990:99999:09990:09090:')
-Image.MEH = Image('09090:00000:00090:00900:09000:')
-Image.MUSIC_CROTCHET = Image('00900:00900:00900:99900:99900:')
-Image.MUSIC_QUAVER = Image('00900:00990:00909:99900:99900:')
-Image.MUSIC_QUAVERS = Image('09999:09009:09009:99099:99099:')
-Image.NO = Image('90009:09090:00900:09090:90009:')
-Image.PACMAN = Image('09999:99090:99900:99990:09999:')
-Image.PITCHFORK = Image('90909:90909:99999:00900:00900:')
-Image.RABBIT = Image('90900:90900:99990:99090:99990:')
-Image.ROLLERSKATE = Image('00099:00099:99999:99999:09090:')
-Image.SAD = Image('00000:09090:00000:09990:90009:')
-Image.SILLY = Image('90009:00000:99999:00909:00999:')
-Image.SKULL = Image('09990:90909:99999:09990:09990:')
-Image.SMILE = Image('00000:00000:00000:90009:09990:')
-Image.SNAKE = Image('99000:99099:09090:09990:00000:')
-Image.SQUARE = Image('99999:90009:90009:90009:99999:')
-Image.SQUARE_SMALL = Image('00000:09990:09090:09990:00000:')
-Image.STICKFIGURE = Image('00900:99999:00900:09090:90009:')
-Image.SURPRISED = Image('09090:00000:00900:09090:00900:')
-Image.SWORD = Image('00900:00900:00900:09990:00900:')
-Image.TARGET = Image('00900:09990:99099:09990:00900:')
-Image.TORTOISE = Image('00000:09990:99999:09090:00000:')
-Image.TRIANGLE = Image('00000:00900:09090:99999:00000:')
-Image.TRIANGLE_LEFT = Image('90000:99000:90900:90090:99999:')
-Image.TSHIRT = Image('99099:99999:09990:09990:09990:')
-Image.UMBRELLA = Image('09990:99999:00900:90900:09900:')
-Image.XMAS = Image('00900:09990:00900:09990:99999:')
-Image.YES = Image('00000:00009:00090:90900:09000:')
-Image.ALL_CLOCKS = (
-    Image.CLOCK12, Image.CLOCK1, Image.CLOCK2, Image.CLOCK3,
-    Image.CLOCK4, Image.CLOCK5, Image.CLOCK6, Image.CLOCK7,
-    Image.CLOCK8, Image.CLOCK9, Image.CLOCK10, Image.CLOCK11)
-Image.ALL_ARROWS = (
-    Image.ARROW_N, Image.ARROW_NE, Image.ARROW_E, Image.ARROW_SE,
-    Image.ARROW_S, Image.ARROW_SW, Image.ARROW_W, Image.ARROW_NW)
+# The built-in images, as rows of brightness digits. See _ImageMeta.
+_IMAGES = {
+    'ANGRY': '90009:09090:00000:99999:90909:',
+    'ARROW_E': '00900:00090:99999:00090:00900:',
+    'ARROW_N': '00900:09990:90909:00900:00900:',
+    'ARROW_NE': '00999:00099:00909:09000:90000:',
+    'ARROW_NW': '99900:99000:90900:00090:00009:',
+    'ARROW_S': '00900:00900:90909:09990:00900:',
+    'ARROW_SE': '90000:09000:00909:00099:00999:',
+    'ARROW_SW': '00009:00090:90900:99000:99900:',
+    'ARROW_W': '00900:09000:99999:09000:00900:',
+    'ASLEEP': '00000:99099:00000:09990:00000:',
+    'BUTTERFLY': '99099:99999:00900:99999:99099:',
+    'CHESSBOARD': '09090:90909:09090:90909:09090:',
+    'CLOCK1': '00090:00090:00900:00000:00000:',
+    'CLOCK2': '00000:00099:00900:00000:00000:',
+    'CLOCK3': '00000:00000:00999:00000:00000:',
+    'CLOCK4': '00000:00000:00900:00099:00000:',
+    'CLOCK5': '00000:00000:00900:00090:00090:',
+    'CLOCK6': '00000:00000:00900:00900:00900:',
+    'CLOCK7': '00000:00000:00900:09000:09000:',
+    'CLOCK8': '00000:00000:00900:99000:00000:',
+    'CLOCK9': '00000:00000:99900:00000:00000:',
+    'CLOCK10': '00000:99000:00900:00000:00000:',
+    'CLOCK11': '09000:09000:00900:00000:00000:',
+    'CLOCK12': '00900:00900:00900:00000:00000:',
+    'CONFUSED': '00000:09090:00000:09090:90909:',
+    'COW': '90009:90009:99999:09990:00900:',
+    'DIAMOND': '00900:09090:90009:09090:00900:',
+    'DIAMOND_SMALL': '00000:00900:09090:00900:00000:',
+    'DUCK': '09900:99900:09999:09990:00000:',
+    'FABULOUS': '99999:99099:00000:09090:09990:',
+    'GHOST': '99999:90909:99999:99999:90909:',
+    'GIRAFFE': '99000:09000:09000:09990:09090:',
+    'GO_DOWN': '00000:99999:09990:00900:00000:',
+    'GO_LEFT': '00090:00990:09990:00990:00090:',
+    'GO_RIGHT': '09000:09900:09990:09900:09000:',
+    'GO_UP': '00000:00900:09990:99999:00000:',
+    'HAPPY': '00000:09090:00000:90009:09990:',
+    'HEART': '09090:99999:99999:09990:00900:',
+    'HEART_SMALL': '00000:09090:09990:00900:00000:',
+    'HOUSE': '00900:09990:99999:09990:09090:',
+    'MEH': '09090:00000:00090:00900:09000:',
+    'MUSIC_CROTCHET': '00900:00900:00900:99900:99900:',
+    'MUSIC_QUAVER': '00900:00990:00909:99900:99900:',
+    'MUSIC_QUAVERS': '09999:09009:09009:99099:99099:',
+    'NO': '90009:09090:00900:09090:90009:',
+    'PACMAN': '09999:99090:99900:99990:09999:',
+    'PITCHFORK': '90909:90909:99999:00900:00900:',
+    'RABBIT': '90900:90900:99990:99090:99990:',
+    'ROLLERSKATE': '00099:00099:99999:99999:09090:',
+    'SAD': '00000:09090:00000:09990:90009:',
+    'SILLY': '90009:00000:99999:00909:00999:',
+    'SKULL': '09990:90909:99999:09990:09990:',
+    'SMILE': '00000:00000:00000:90009:09990:',
+    'SNAKE': '99000:99099:09090:09990:00000:',
+    'SQUARE': '99999:90009:90009:90009:99999:',
+    'SQUARE_SMALL': '00000:09990:09090:09990:00000:',
+    'STICKFIGURE': '00900:99999:00900:09090:90009:',
+    'SURPRISED': '09090:00000:00900:09090:00900:',
+    'SWORD': '00900:00900:00900:09990:00900:',
+    'TARGET': '00900:09990:99099:09990:00900:',
+    'TORTOISE': '00000:09990:99999:09090:00000:',
+    'TRIANGLE': '00000:00900:09090:99999:00000:',
+    'TRIANGLE_LEFT': '90000:99000:90900:90090:99999:',
+    'TSHIRT': '99099:99999:09990:09990:09990:',
+    'UMBRELLA': '09990:99999:00900:90900:09900:',
+    'XMAS': '00900:09990:00900:09990:99999:',
+    'YES': '00000:00009:00090:90900:09000:',
+}
+_IMAGE_GROUPS = {
+    'ALL_CLOCKS': (
+        'CLOCK12', 'CLOCK1', 'CLOCK2', 'CLOCK3', 'CLOCK4', 'CLOCK5',
+        'CLOCK6', 'CLOCK7', 'CLOCK8', 'CLOCK9', 'CLOCK10', 'CLOCK11'),
+    'ALL_ARROWS': (
+        'ARROW_N', 'ARROW_NE', 'ARROW_E', 'ARROW_SE',
+        'ARROW_S', 'ARROW_SW', 'ARROW_W', 'ARROW_NW'),
+}
 
 
 # noinspection PyProtectedMember
@@ -582,11 +1487,14 @@ class Display:
         self._hub = hub
         self._me = me
 
+        self._get_pixel_template = f'{me}.pixel(%d,%d)'.encode()
+        self._set_pixel_template = f'{me}.pixel(%d,%d,%d)'.encode()
+
     def clear(self):
         """
         Turns off all the pixels.
         """
-        return self._hub._mcall(self._me, 'clear')
+        return self._hub._mcall_nowait(self._me, 'clear')
 
     def rotation(self, rotation: int):
         """
@@ -650,8 +1558,59 @@ class Display:
         Returns:
         If no brightness is given, this returns the brightness of the selected
         pixel. Otherwise it returns None.
+
+        Inside a frame() block, this gets or sets the pixel of the frame, without
+        communicating with the hub.
+        """
+        # The image being built by frame() in this thread, if any
+        frame = getattr(self._hub._local, 'frame', None)
+        if frame is not None:
+            return self._frame_pixel(frame, *args, **kwargs)
+        if not kwargs and all(type(arg) is int for arg in args):
+            if len(args) == 3:
+                return self._hub._fastcall_int_nowait(self._set_pixel_template, *args)
+            elif len(args) == 2:
+                return self._hub._fastcall_int(self._get_pixel_template, *args)
+        if len(args) == 3 or 'brightness' in kwargs:
+            return self._hub._mcall_nowait(self._me, 'pixel', *args, **kwargs)
+        else:
+            return self._hub._mcall(self._me, 'pixel', *args, **kwargs)
+
+    @staticmethod
+    def _frame_pixel(frame: Image, x: int, y: int, brightness: int | None = None):
+        if brightness is None:
+            return frame.get_pixel(x, y)
+        frame.set_pixel(x, y, brightness)
+
+    @contextmanager
+    def frame(self):
         """
-        return self._hub._mcall(self._me, 'pixel', *args, **kwargs)
+        Builds an image and then shows it, using a single command.
+
+        Inside the block, pixel() changes the frame instead of the display.
+        The frame starts with all pixels off, and is also available as the
+        target of the with statement:
+
+            with hub.display.frame() as image:
+                for i in range(5):
+                    hub.display.pixel(i, i, 9)
+                image.set_pixel(4, 0, 5)
+
+        When the block ends, the frame is shown. If the block raises an
+        exception, nothing is shown.
+
+        The frame belongs to the thread which started the block, so pixel()
+        calls from other threads still change the display.
+        """
+        if getattr(self._hub._local, 'frame', None) is not None:
+            raise RuntimeError("Display.frame() blocks can't be nested")
+        image = Image(5, 5)
+        self._hub._local.frame = image
+        try:
+            yield image
+        finally:
+            self._hub._local.frame = None
+        self.show(image)
 
     def show(self, *args, **kwargs):
         """
@@ -679,7 +1638,7 @@ class Display:
             5: Images will fade in, starting from an empty display.
             6: Images will fade out, starting from the original image.
         """
-        return self._hub._mcall(self._me, 'show', *args, **kwargs)
+        return self._hub._mcall_nowait(self._me, 'show', *args, **kwargs)
 
 
 # noinspection PyProtectedMember
@@ -688,6 +1647,8 @@ class Motion:
         self._hub = hub
         self._me = me
 
+        self._align_to_model_template = f'{me}.align_to_model(%d,%d)'.encode()
+
     def accelerometer(self, filtered=False) -> (int, int, int):
         """
         Gets the acceleration of the hub along the x, y, and z axis.
@@ -700,7 +1661,7 @@ class Motion:
         Acceleration of the hub with units of cm/s^2. On a perfectly level
         surface, this gives (0, 0, 981).
         """
-        return self._hub._mcall(self._me, 'accelerometer', filtered)
+        return self._hub._eval_binary(f'{self._me}.accelerometer({filtered!r})', '<3i')
 
     def gyroscope(self, filtered=False) -> (int, int, int):
         """
@@ -713,7 +1674,7 @@ class Motion:
         Returns:
         Angular velocity with units of degrees per second.
         """
-        return self._hub._mcall(self._me, 'gyroscope', filtered)
+        return self._hub._eval_binary(f'{self._me}.gyroscope({filtered!r})', '<3i')
 
     def align_to_model(self, top: int, front: int) -> None:
         """
@@ -729,7 +1690,10 @@ class Motion:
         front – Which hub side is on the front of your model.
         nsamples – Number of samples for calibration between 0 and 10000. It is 100 by default.
         """
-        return self._hub._mcall(self._me, 'align_to_model', top, front)
+        if type(top) is int and type(front) is int:
+            return self._hub._fastcall_int_nowait(self._align_to_model_template, top, front)
+        else:
+            return self._hub._mcall_nowait(self._me, 'align_to_model', top, front)
 
     def yaw_pitch_roll(self, *args, **kwargs):
         """
@@ -755,6 +1719,8 @@ class Motion:
         Returns:
         If no arguments are given, this returns a tuple of yaw, pitch, and roll values in degrees.
         """
+        if not args and not kwargs:
+            return self._hub._eval_binary(f'{self._me}.yaw_pitch_roll()', '<3i')
         return self._hub._mcall(self._me, 'yaw_pitch_roll', *args, **kwargs)
 
     def orientation(self) -> int:
@@ -766,7 +1732,7 @@ class Motion:
         """
         return self._hub._mcall(self._me, 'orientation')
 
-    def gesture(self) -> Optional[int]:
+    def gesture(self) -> int | None:
         """
         Gets the most recent gesture that the hub has made since this function was last called.
 
@@ -776,6 +1742,50 @@ class Motion:
         """
         return self._hub._mcall(self._me, 'gesture')
 
+    def sample(self, n: int, period_ms: int, filtered=False, gyroscope=False) -> list:
+        """
+        Samples the accelerometer (or the gyroscope) n times, every period_ms
+        milliseconds.
+
+        The sampling is done by the hub, so the timing doesn't depend on the
+        connection, and all the samples are sent together when it's done.
+
+        Parameters:
+        n – Number of samples.
+        period_ms – Time between samples in milliseconds.
+        filtered – Passed to accelerometer() or gyroscope().
+        gyroscope – Choose True to sample the gyroscope instead of the accelerometer.
+
+        Returns:
+        A list of n (x, y, z) tuples, as returned by accelerometer() or gyroscope().
+        """
+        if self._hub._current_batch() is not None:
+            raise RuntimeError("sample() can't be used inside Hub.batch()")
+        if n < 1:
+            raise ValueError("n must be at least 1")
+        method = 'gyroscope' if gyroscope else 'accelerometer'
+        b = self._hub._pb.exec_fast(
+            f'_sample({self._me}.{method}, {n:d}, {period_ms:d}, {filtered!r})',
+            6 * n, timeout=10 + n * period_ms / 1000)
+        values = struct.unpack(f'<{3 * n}h', b)
+        return [values[i:i + 3] for i in range(0, len(values), 3)]
+
+    def snapshot(self, filtered=False) -> tuple:
+        """
+        Gets the acceleration, angular velocity, yaw-pitch-roll angles and
+        orientation of the hub using a single round-trip.
+
+        Parameters:
+        filtered – Passed to accelerometer() and gyroscope().
+
+        Returns:
+        A tuple of (accelerometer, gyroscope, yaw_pitch_roll, orientation), with
+        the same values as the individual methods.
+        """
+        return self._hub._eval_many([
+            f'{self._me}.accelerometer({filtered!r})', f'{self._me}.gyroscope({filtered!r})',
+            f'{self._me}.yaw_pitch_roll()', f'{self._me}.orientation()'])
+
     # The hub was tapped.
     TAPPED = 0
 
@@ -823,6 +1833,8 @@ class Sound:
         self._hub = hub
         self._me = me
 
+        self._beep_template = f'{me}.beep(%d,%d,%d)'.encode()
+
     def volume(self, *args, **kwargs):
         """
         volume(volume: int) -> None
@@ -846,7 +1858,10 @@ class Sound:
         time – Duration of the beep in milliseconds (0 - 32767).
         waveform – Wave form used for the beep. See constants for all possible values.
         """
-        return self._hub._mcall(self._me, 'beep', freq, time, waveform)
+        if type(freq) is int and type(time) is int and type(waveform) is int:
+            return self._hub._fastcall_int_nowait(self._beep_template, freq, time, waveform)
+        else:
+            return self._hub._mcall_nowait(self._me, 'beep', freq, time, waveform)
 
     def play(self, filename: str, rate=16000) -> None:
         """
@@ -860,7 +1875,7 @@ class Sound:
         Keyword Arguments:
         rate – Playback speed in Hz.
         """
-        return self._hub._mcall(self._me, 'play', filename, rate)
+        return self._hub._mcall_nowait(self._me, 'play', filename, rate)
 
     # The beep is a smooth sine wave.
     SOUND_SIN = 0
@@ -907,21 +1922,62 @@ class Supervision:
         return self._hub._mcall(self._me, 'info')
 
 
+class _lazy_slot:
+    """
+    Like cached_property, for classes with __slots__. The value is kept in the
+    slot with the same name, prefixed by an underscore.
+    """
+    def __init__(self, func):
+        self._func = func
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self._slot = getattr(owner, '_' + name)
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        try:
+            return self._slot.__get__(obj, owner)
+        except AttributeError:
+            value = self._func(obj)
+            self._slot.__set__(obj, value)
+            return value
+
+
 # noinspection PyProtectedMember
 class Port:
+    # info() is cached for this many seconds, since a device may be plugged in
+    # or out at any time
+    INFO_TTL = 1.0
+
+    # The children are created when they are first used
+    __slots__ = ('_hub', '_me', '_device', '_motor', '_p5', '_p6')
+
     def __init__(self, hub: Hub, me: str):
         self._hub = hub
         self._me = me
 
-        self.device = Device(hub, f'{me}.device')
-        self.motor = Motor(hub, f'{me}.motor')
-        # Not implemented yet
-        self.p5 = Pin(hub, f'{me}.p5')
-        self.p6 = Pin(hub, f'{me}.p6')
-
     def __repr__(self):
         return self._me
 
+    @_lazy_slot
+    def device(self) -> Device:
+        return Device(self._hub, f'{self._me}.device')
+
+    @_lazy_slot
+    def motor(self) -> Motor:
+        return Motor(self._hub, f'{self._me}.motor', self._me.rsplit('.', 1)[1])
+
+    # Not implemented yet
+    @_lazy_slot
+    def p5(self) -> Pin:
+        return Pin(self._hub, f'{self._me}.p5')
+
+    @_lazy_slot
+    def p6(self) -> Pin:
+        return Pin(self._hub, f'{self._me}.p6')
+
     def pwm(self, value: int) -> None:
         """
         Applies a PWM signal to the power pins of the port or device.
@@ -946,6 +2002,8 @@ class Port:
         mode – Mode value. See the port constants for all possible values
         baud_rate – New baud rate of the port, if applicable.
         """
+        # info() depends on the mode
+        self.invalidate()
         return self._hub._mcall(self._me, 'mode', *args, **kwargs)
 
     def info(self):
@@ -1025,8 +2083,17 @@ class Port:
         }
         Returns:
         Information dictionary as documented above.
+
+        The result is cached for INFO_TTL seconds. Use invalidate() to read it
+        again sooner.
         """
-        return self._hub._mcall(self._me, 'info')
+        return self._hub._eval_cached(f'{self._me}.info()', self.INFO_TTL)
+
+    def invalidate(self) -> None:
+        """
+        Forgets the cached result of info(), so it will be read again from the hub.
+        """
+        self._hub._cache.pop(f'{self._me}.info()', None)
 
     # Methods for use with MODE_FULL_DUPLEX and MODE_HALF_DUPLEX
 
@@ -1066,6 +2133,8 @@ class Port:
 
 # noinspection PyProtectedMember
 class Device:
+    __slots__ = ('_hub', '_me')
+
     def __init__(self, hub: Hub, me: str):
         self._hub = hub
         self._me = me
@@ -1084,7 +2153,7 @@ class Device:
         Returns
         Values or measurements representing the device state.
         """
-        return self._hub._mcall(self._me, 'get', *args, **kwargs)
+        return self._hub._get_values(self._me, args, kwargs)
 
     def mode(self, *args, **kwargs):
         """
@@ -1150,15 +2219,92 @@ class Device:
     FORMAT_SI = 2
 
 
+class _Chain:
+    """
+    Collects method calls on an object, to send them together with submit().
+    """
+    def __init__(self, obj):
+        self._obj = obj
+        self._calls = []
+        # Whether a call may change a value which obj caches
+        self._forget_cached = False
+
+    def __getattr__(self, name):
+        # Only methods which the hub runs can be chained, not those which
+        # run on the host, like wait_until_done()
+        if name not in self._obj._CHAIN_METHODS:
+            raise AttributeError(name)
+
+        def add_call(*args, **kwargs):
+            for key in kwargs:
+                if key in self._obj._HOST_KWARGS:
+                    raise TypeError(f"{name}() argument {key!r} can't be used in a chain")
+            # noinspection PyProtectedMember
+            self._calls.append(self._obj._hub._format_mcall(self._obj._me, name, args, kwargs))
+            if name in getattr(self._obj, '_CACHED_METHODS', ()):
+                self._forget_cached = True
+            return self
+        return add_call
+
+    def submit(self):
+        """
+        Runs the calls one after the other, and returns the result of the last one.
+
+        Inside a Hub.batch() block, returns a BatchResult.
+        """
+        if not self._calls:
+            raise ValueError('No calls to submit')
+        # A tuple is evaluated from left to right, so this is an expression
+        # which makes the calls in order.
+        # noinspection PyProtectedMember
+        hub = self._obj._hub
+        r = hub._eval(f"({', '.join(self._calls)},)[-1]")
+        if self._forget_cached:
+            for method in self._obj._CACHED_METHODS:
+                hub._cache.pop(f'{self._obj._me}.{method}()', None)
+        return r
+
+
 # noinspection PyProtectedMember
 class Motor:
-    def __init__(self, hub: Hub, me: str):
+    # The arguments of default(), in order
+    _DEFAULT_ARGS = ('speed', 'max_power', 'acceleration', 'deceleration', 'stop', 'pid', 'stall')
+    # Methods whose values are cached. See pid() and default().
+    _CACHED_METHODS = ('pid', 'default')
+    # Methods which can be called in a chain(), and keyword arguments which
+    # are handled on the host, so can't be.
+    _CHAIN_METHODS = frozenset(['get', 'mode', 'pwm', 'float', 'brake', 'hold', 'busy', 'run_at_speed',
+                                'run_for_time', 'run_for_degrees', 'run_to_position', 'preset', 'pid',
+                                'default'])
+    _HOST_KWARGS = frozenset(['no_delay', 'wait', 'force'])
+
+    __slots__ = ('_hub', '_me', '_letter')
+
+    def __init__(self, hub: Hub, me: str, letter: str | None = None):
         self._hub = hub
         self._me = me
+        # The letter of the port, used for naming pairs
+        self._letter = me.split('.')[2] if letter is None else letter
 
     def __repr__(self):
         return self._me
 
+    def chain(self) -> _Chain:
+        """
+        Prepares several calls to be sent to the motor with a single round-trip.
+
+        Call methods of the returned object as if it was the motor, and then
+        call its submit() method. The calls run one after the other, and
+        submit() returns the result of the last one. For example:
+
+            speed_pct, rel_pos, abs_pos, pwm = motor.chain().preset(0).run_to_position(90).get().submit()
+
+        Only methods which run on the hub can be chained, so wait_until_done(),
+        pair() and the *_async() methods can't, nor can the wait, no_delay and
+        force arguments be given.
+        """
+        return _Chain(self)
+
     def get(self, *args, **kwargs) -> list:
         """
         get(format: Optional[int]) -> list
@@ -1170,7 +2316,7 @@ class Motor:
         Returns
         Values or measurements representing the device state.
         """
-        return self._hub._mcall(self._me, 'get', *args, **kwargs)
+        return self._hub._get_values(self._me, args, kwargs)
 
     def mode(self, *args, **kwargs):
         """
@@ -1209,23 +2355,35 @@ class Motor:
         """
         return self._hub._mcall(self._me, 'pwm', value)
 
-    def float(self) -> None:
+    def float(self, no_delay: bool = True) -> None:
         """
         Floats (coasts) the motor, as if disconnected from the hub.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'float')
+        return self._hub._mcall_nowait(self._me, 'float', no_delay=no_delay)
 
-    def brake(self) -> None:
+    def brake(self, no_delay: bool = True) -> None:
         """
         Passively brakes the motor, as if shorting the motor terminals.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'brake')
+        return self._hub._mcall_nowait(self._me, 'brake', no_delay=no_delay)
 
-    def hold(self) -> None:
+    def hold(self, no_delay: bool = True) -> None:
         """
         Actively hold the motor in its current position.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'hold')
+        return self._hub._mcall_nowait(self._me, 'hold', no_delay=no_delay)
 
     def busy(self, typ=0) -> bool:
         """
@@ -1239,6 +2397,36 @@ class Motor:
         """
         return self._hub._mcall(self._me, 'busy', typ)
 
+    def wait_until_done(self, timeout: float | None = None) -> bool:
+        """
+        Waits until the motor isn't busy executing a motor command.
+
+        The hub checks busy(BUSY_MOTOR) every millisecond, for up to 1 ms on
+        the first round-trip and then for up to twice as long each time, up to
+        50 ms. Between round-trips other threads can use the hub, so a call
+        like brake() from another thread waits at most about 50 ms.
+
+        Parameters:
+        timeout – How many seconds to wait. None means to wait until the motor is done.
+
+        Returns:
+        True if the motor is done, False if the timeout passed first.
+        """
+        if self._hub._current_batch() is not None:
+            raise RuntimeError("wait_until_done() can't be used inside Hub.batch()")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ms = 1
+        while True:
+            if deadline is not None:
+                ms = min(ms, max(0, int((deadline - time.monotonic()) * 1000)))
+            if eval(self._hub._pb.exec_fast(f'print(_w({self._me}, {ms:d}))')):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            ms = min(2 * ms, 50)
+            # Let a thread waiting for the hub take it before the next round-trip
+            time.sleep(0)
+
     def run_at_speed(self, *args, **kwargs) -> None:
         """
         run_at_speed(speed: int) -> None
@@ -1260,7 +2448,7 @@ class Motor:
         """
         return self._hub._mcall(self._me, 'run_at_speed', *args, **kwargs)
 
-    def run_for_time(self, *args, **kwargs) -> None:
+    def run_for_time(self, *args, wait: bool = False, **kwargs) -> None:
         """
         run_for_time(msec: int) → None
         run_for_time(msec: int, speed: int, max_power: int, stop: int,
@@ -1281,10 +2469,14 @@ class Motor:
         deceleration – The time in milliseconds (0-10000) for the motor to stop
             when starting from the maximum rated speed.
         stall – Selects whether the motor should stop trying to reach the endpoint when stalled (True) or not (False).
+        wait – Choose True to return only when the motor is done. See wait_until_done().
         """
-        return self._hub._mcall(self._me, 'run_for_time', *args, **kwargs)
+        result = self._hub._mcall(self._me, 'run_for_time', *args, **kwargs)
+        if wait:
+            self.wait_until_done()
+        return result
 
-    def run_for_degrees(self, *args, **kwargs) -> None:
+    def run_for_degrees(self, *args, wait: bool = False, **kwargs) -> None:
         """
         run_for_degrees(degrees: int) -> None
         run_for_degrees(degrees: int, speed: int, max_power: int, stop: int,
@@ -1308,10 +2500,14 @@ class Motor:
         deceleration – The time in milliseconds (0-10000) for the motor to stop
             when starting from the maximum rated speed.
         stall – Selects whether the motor should stop trying to reach the endpoint when stalled (True) or not (False).
+        wait – Choose True to return only when the motor is done. See wait_until_done().
         """
-        return self._hub._mcall(self._me, 'run_for_degrees', *args, **kwargs)
+        result = self._hub._mcall(self._me, 'run_for_degrees', *args, **kwargs)
+        if wait:
+            self.wait_until_done()
+        return result
 
-    def run_to_position(self, *args, **kwargs) -> None:
+    def run_to_position(self, *args, wait: bool = False, **kwargs) -> None:
         """
         run_to_position(position: int) -> None
         run_to_position(position: int, speed: int, max_power: int, stop: int,
@@ -1335,8 +2531,40 @@ class Motor:
         deceleration – The time in milliseconds (0-10000) for the motor to stop
             when starting from the maximum rated speed.
         stall – Selects whether the motor should stop trying to reach the endpoint when stalled (True) or not (False).
+        wait – Choose True to return only when the motor is done. See wait_until_done().
         """
-        return self._hub._mcall(self._me, 'run_to_position', *args, **kwargs)
+        result = self._hub._mcall(self._me, 'run_to_position', *args, **kwargs)
+        if wait:
+            self.wait_until_done()
+        return result
+
+    async def run_at_speed_async(self, *args, **kwargs) -> None:
+        """
+        Like run_at_speed(), but returns an awaitable. Commands to several motors
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_at_speed', *args, **kwargs)
+
+    async def run_for_time_async(self, *args, **kwargs) -> None:
+        """
+        Like run_for_time(), but returns an awaitable. Commands to several motors
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_for_time', *args, **kwargs)
+
+    async def run_for_degrees_async(self, *args, **kwargs) -> None:
+        """
+        Like run_for_degrees(), but returns an awaitable. Commands to several motors
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_for_degrees', *args, **kwargs)
+
+    async def run_to_position_async(self, *args, **kwargs) -> None:
+        """
+        Like run_to_position(), but returns an awaitable. Commands to several motors
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_to_position', *args, **kwargs)
 
     def preset(self, position: int) -> None:
         """
@@ -1347,7 +2575,7 @@ class Motor:
         """
         return self._hub._mcall(self._me, 'preset', position)
 
-    def pid(self, *args, **kwargs):
+    def pid(self, *args, force: bool = False, **kwargs):
         """
         pid() -> tuple
         pid(p: int, i: int, d: int) -> None
@@ -1361,10 +2589,27 @@ class Motor:
         Returns:
         If no arguments are given, this returns the values previously set by the user, if any.
         The system defaults cannot be read.
-        """
-        return self._hub._mcall(self._me, 'pid', *args, **kwargs)
 
-    def default(self, *args, **kwargs):
+        The values are remembered when they are set or read, so getting them
+        again doesn't need a round-trip. Choose force=True to read them from
+        the hub anyway.
+        """
+        expr = f'{self._me}.pid()'
+        if not args and not kwargs:
+            if force:
+                self._hub._cache.pop(expr, None)
+            return self._hub._eval_cached(expr, float('inf'))
+        r = self._hub._mcall(self._me, 'pid', *args, **kwargs)
+        # default() includes the pid values
+        self._hub._cache.pop(f'{self._me}.default()', None)
+        if self._hub._current_batch() is None:
+            values = args + tuple(kwargs[k] for k in ('p', 'i', 'd')[len(args):])
+            self._hub._cache[expr] = time.monotonic(), values
+        else:
+            self._hub._cache.pop(expr, None)
+        return r
+
+    def default(self, *args, force: bool = False, **kwargs):
         """
         default() -> dict
         default(speed: int, max_power: int, acceleration: int, deceleration: int,
@@ -1383,10 +2628,28 @@ class Motor:
 
         Returns:
         If no arguments are given, this returns the current settings.
-        """
-        return self._hub._mcall(self._me, 'default', *args, **kwargs)
 
-    def pair(self, other_motor: Motor) -> Union[MotorPair, bool, None]:
+        The settings are remembered when they are read, and updated when they
+        are set, so getting them again doesn't need a round-trip. Choose
+        force=True to read them from the hub anyway.
+        """
+        expr = f'{self._me}.default()'
+        if not args and not kwargs:
+            if force:
+                self._hub._cache.pop(expr, None)
+            return self._hub._eval_cached(expr, float('inf'))
+        r = self._hub._mcall(self._me, 'default', *args, **kwargs)
+        settings = dict(zip(self._DEFAULT_ARGS, args), **kwargs)
+        if 'pid' in settings:
+            self._hub._cache.pop(f'{self._me}.pid()', None)
+        cached = self._hub._cache.get(expr)
+        if cached is not None and self._hub._current_batch() is None:
+            self._hub._cache[expr] = time.monotonic(), {**cached[1], **settings}
+        else:
+            self._hub._cache.pop(expr, None)
+        return r
+
+    def pair(self, other_motor: Motor) -> MotorPair | bool | None:
         """
         Pairs this motor to other_motor to create a MotorPair object.
 
@@ -1400,10 +2663,10 @@ class Motor:
         On success, this returns the MotorPair object. It returns False to
         indicate an incompatible pair or None for other errors.
         """
-        my_letter = self._me.split('.')[2]
-        other_letter = other_motor._me.split('.')[2]
-        pair_name = f'pair{my_letter}{other_letter}'
-        b = self._hub._pb.exec_(f'{pair_name} = {self._me}.pair({other_motor._me}); print({pair_name})')
+        if self._hub._current_batch() is not None:
+            raise RuntimeError("pair() can't be used inside Hub.batch()")
+        pair_name = f'pair{self._letter}{other_motor._letter}'
+        b = self._hub._pb.exec_fast(f'{pair_name} = {self._me}.pair({other_motor._me}); print({pair_name})')
         if b == b'False':
             return False
         elif b == b'None':
@@ -1439,6 +2702,8 @@ class Motor:
 
 # noinspection PyProtectedMember
 class MotorPair:
+    __slots__ = ('_hub', '_me', '_primary', '_secondary')
+
     def __init__(self, hub: Hub, me: str, primary: Motor, secondary: Motor):
         self._hub = hub
         self._me = me
@@ -1484,23 +2749,35 @@ class MotorPair:
         """
         return self._hub._mcall(self._me, 'unpair')
 
-    def float(self) -> None:
+    def float(self, no_delay: bool = True) -> None:
         """
         Floats (coasts) both motors, as if disconnected from the hub.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'float')
+        return self._hub._mcall_nowait(self._me, 'float', no_delay=no_delay)
 
-    def brake(self) -> None:
+    def brake(self, no_delay: bool = True) -> None:
         """
         Passively brakes both motors, as if shorting the motor terminals.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'brake')
+        return self._hub._mcall_nowait(self._me, 'brake', no_delay=no_delay)
 
-    def hold(self) -> None:
+    def hold(self, no_delay: bool = True) -> None:
         """
         Actively holds both motor in their current position.
+
+        Keyword Arguments:
+        no_delay – Choose False to allow sending the command a few milliseconds
+        later, together with the following commands.
         """
-        return self._hub._mcall(self._me, 'hold')
+        return self._hub._mcall_nowait(self._me, 'hold', no_delay=no_delay)
 
     def pwm(self, pwm_0: int, pwm_1: int) -> None:
         """
@@ -1615,6 +2892,34 @@ class MotorPair:
         """
         return self._hub._mcall(self._me, 'run_to_position', *args, **kwargs)
 
+    async def run_at_speed_async(self, *args, **kwargs) -> None:
+        """
+        Like run_at_speed(), but returns an awaitable. Commands to several motor pairs
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_at_speed', *args, **kwargs)
+
+    async def run_for_time_async(self, *args, **kwargs) -> None:
+        """
+        Like run_for_time(), but returns an awaitable. Commands to several motor pairs
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_for_time', *args, **kwargs)
+
+    async def run_for_degrees_async(self, *args, **kwargs) -> None:
+        """
+        Like run_for_degrees(), but returns an awaitable. Commands to several motor pairs
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_for_degrees', *args, **kwargs)
+
+    async def run_to_position_async(self, *args, **kwargs) -> None:
+        """
+        Like run_to_position(), but returns an awaitable. Commands to several motor pairs
+        may be sent concurrently, without waiting for each other.
+        """
+        return await self._hub._mcall_async(self._me, 'run_to_position', *args, **kwargs)
+
     def preset(self, position_0: int, position_1: int) -> None:
         """
         Presets the starting positions used by run_to_position.
@@ -1639,6 +2944,8 @@ class MotorPair:
 
 # noinspection PyProtectedMember
 class Pin:
+    __slots__ = ('_hub', '_me')
+
     def __init__(self, hub: Hub, me: str):
         self._hub = hub
         self._me = me
@@ -1680,12 +2987,23 @@ class Os:
         self._hub = hub
 
         self.sep = '/'
-        methods = [
-            'remove', 'chdir', 'dupterm', 'getcwd', 'ilistdir', 'listdir',
-            'mkdir', 'mount', 'rename', 'rmdir', 'stat', 'statvfs', 'sync',
-            'umount', 'uname', 'unlink']
-        for method in methods:
-            setattr(self, method, partial(self._call, method))
-
-    def _call(self, method, *args, **kwargs):
+
+
+_OS_METHODS = [
+    'remove', 'chdir', 'dupterm', 'getcwd', 'ilistdir', 'listdir',
+    'mkdir', 'mount', 'rename', 'rmdir', 'stat', 'statvfs', 'sync',
+    'umount', 'uname', 'unlink']
+
+
+def _make_os_method(method):
+    # noinspection PyProtectedMember
+    def call(self, *args, **kwargs):
         return self._hub._mcall('os', method, *args, **kwargs)
+    call.__name__ = method
+    call.__qualname__ = f'Os.{method}'
+    return call
+
+
+for _method in _OS_METHODS:
+    setattr(Os, _method, _make_os_method(_method))
+del _method
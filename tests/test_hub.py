@@ -0,0 +1,124 @@
+import struct
+import threading
+import unittest
+
+from mindstorms import Display, Hub, Motor, PyboardError, _GET_SIZE
+from test_pyboard import make_pyboard, reply, TRACEBACK
+
+
+def make_hub(respond) -> Hub:
+    # Skip connecting, which runs _HUB_INIT
+    hub = Hub.__new__(Hub)
+    hub._pb = make_pyboard(respond)
+    hub._cache = {}
+    hub._prefixes = {}
+    hub._sample_exprs = {}
+    hub._local = threading.local()
+    return hub
+
+
+def get_reply(values):
+    frame = bytes([len(values)]) + struct.pack(f'<{len(values)}i', *values)
+    return reply(b'B' + frame.ljust(_GET_SIZE, b'\x00'))
+
+
+class GetTest(unittest.TestCase):
+    def test_ints(self):
+        hub = make_hub(lambda command: get_reply([1, 15876, -3]))
+        self.assertEqual(hub._get_values('hub.port.A.motor', (), {}), [1, 15876, -3])
+
+    def test_repr(self):
+        hub = make_hub(lambda command: reply(b'B\xff'.ljust(_GET_SIZE + 1, b'\x00') + b'[1.5, 2]\r\n'))
+        self.assertEqual(hub._get_values('hub.port.A.device', (), {}), [1.5, 2])
+
+    def test_nothing_attached(self):
+        # On the hub, port.A.motor is None
+        responses = [reply(err=TRACEBACK), get_reply([4])]
+        hub = make_hub(lambda command: responses.pop(0))
+        with self.assertRaises(PyboardError):
+            hub._get_values('hub.port.A.motor', (), {})
+        self.assertEqual(hub._get_values('hub.port.B.motor', (), {}), [4])
+
+
+class MotorSettingsTest(unittest.TestCase):
+    def test_chain_forgets_pid(self):
+        responses = [reply(b'(1, 2, 3)\r\n'), reply(b'None\r\n'), reply(b'(5, 6, 7)\r\n')]
+        hub = make_hub(lambda command: responses.pop(0))
+        motor = Motor(hub, 'hub.port.A.motor', 'A')
+        self.assertEqual(motor.pid(), (1, 2, 3))
+        motor.chain().pid(5, 6, 7).submit()
+        self.assertEqual(motor.pid(), (5, 6, 7))
+
+    def test_chain_host_only(self):
+        hub = make_hub(lambda command: self.fail('nothing should be sent'))
+        chain = Motor(hub, 'hub.port.A.motor').chain()
+        for name in ['wait_until_done', 'pair', 'run_for_degrees_async', 'chain', '_format']:
+            with self.assertRaises(AttributeError):
+                getattr(chain, name)
+        with self.assertRaises(TypeError):
+            chain.pid(force=True)
+        with self.assertRaises(TypeError):
+            chain.brake(no_delay=False)
+
+
+class MotorTest(unittest.TestCase):
+    def test_letter(self):
+        hub = make_hub(lambda command: reply())
+        self.assertEqual(Motor(hub, 'hub.port.C.motor')._letter, 'C')
+        self.assertEqual(Motor(hub, 'hub.port.C.motor', 'C')._letter, 'C')
+
+    def test_wait_until_done(self):
+        # The hub is asked to wait for longer each time, so other threads can use it in between
+        commands = []
+        responses = [reply(b'None\r\n')] + [reply(b'False\r\n')] * 7 + [reply(b'True\r\n')]
+        hub = make_hub(lambda command: commands.append(command) or responses.pop(0))
+        Motor(hub, 'hub.port.A.motor').run_for_degrees(90, wait=True)
+        self.assertEqual(commands, [b'print(repr(hub.port.A.motor.run_for_degrees(90)))'] + [
+            f'print(_w(hub.port.A.motor, {ms}))'.encode() for ms in [1, 2, 4, 8, 16, 32, 50, 50]])
+
+
+class BatchTest(unittest.TestCase):
+    def test_void_calls(self):
+        commands = []
+        hub = make_hub(lambda command: commands.append(command) or reply(b'[None, None]\r\n'))
+        motor = Motor(hub, 'hub.port.A.motor', 'A')
+        with hub.batch():
+            pwm = motor.pwm(50)
+            brake = motor.brake()
+        self.assertEqual(commands, [b'print(repr([hub.port.A.motor.pwm(50), hub.port.A.motor.brake()]))'])
+        self.assertIsNone(pwm.value)
+        self.assertIsNone(brake.value)
+
+
+class CloseTest(unittest.TestCase):
+    def test_close_raises(self):
+        hub = make_hub(lambda command: reply(err=TRACEBACK) if command.startswith(b'hub.') else b'')
+        Motor(hub, 'hub.port.A.motor').pwm(50)
+        with self.assertRaises(PyboardError):
+            hub.close()
+
+
+class DisplayTest(unittest.TestCase):
+    def test_frame(self):
+        commands = []
+        hub = make_hub(lambda command: commands.append(command) or reply())
+        display = Display(hub, 'hub.display')
+        with display.frame() as image:
+            display.pixel(1, 2, 9)
+            # Other threads still change the display
+            thread = threading.Thread(target=display.pixel, args=(0, 0, 5))
+            thread.start()
+            thread.join()
+            hub._pb.sync()
+            with self.assertRaises(RuntimeError):
+                with display.frame():
+                    pass
+        hub._pb.sync()
+        self.assertEqual(image.get_pixel(1, 2), 9)
+        self.assertEqual(image.get_pixel(0, 0), 0)
+        self.assertEqual(commands[0], b'hub.display.pixel(0,0,5)')
+        self.assertEqual(len(commands), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
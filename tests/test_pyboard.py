@@ -0,0 +1,125 @@
+import unittest
+import weakref
+from concurrent.futures import Future
+from unittest import mock
+
+from mindstorms import _Pyboard, PyboardError, _flush_at_exit
+
+
+class FakeSerial:
+    """
+    A serial port of a hub in the raw REPL. Each command is answered with the
+    bytes returned by respond(command).
+    """
+    def __init__(self, *args, **kwargs):
+        self.port = None
+        self.timeout = None
+        self.respond = None
+        self._in = bytearray()
+        self._out = bytearray()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, data):
+        self._in += data
+        while b'\x04' in self._in:
+            command, _, rest = bytes(self._in).partition(b'\x04')
+            self._in = bytearray(rest)
+            self._out += self.respond(command)
+        return len(data)
+
+    def inWaiting(self):
+        return len(self._out)
+
+    def read(self, n=1):
+        data = bytes(self._out[:n])
+        del self._out[:n]
+        return data
+
+
+def make_pyboard(respond) -> _Pyboard:
+    with mock.patch('serial.Serial', FakeSerial):
+        pb = _Pyboard('/dev/fake')
+    pb.serial.respond = respond
+    return pb
+
+
+def reply(out=b'', err=b''):
+    return b'OK' + out + b'\x04' + err + b'\x04>'
+
+
+TRACEBACK = b'Traceback (most recent call last):\r\nZeroDivisionError: divide by zero\r\n'
+
+
+class ExecFastTest(unittest.TestCase):
+    def test_text(self):
+        pb = make_pyboard(lambda command: reply(b'3\r\n'))
+        self.assertEqual(pb.exec_fast('print(1 + 2)'), b'3\r\n')
+
+    def test_raw(self):
+        # The raw bytes may look like the end of the reply
+        pb = make_pyboard(lambda command: reply(b'B\x04>\x00\x00'))
+        self.assertEqual(pb.exec_fast('_b("<i", (15876,))', 4), b'\x04>\x00\x00')
+
+    def test_raw_exception(self):
+        responses = [reply(err=TRACEBACK), reply(b'B\x01\x00\x00\x00')]
+        pb = make_pyboard(lambda command: responses.pop(0))
+        with self.assertRaises(PyboardError) as cm:
+            pb.exec_fast('_b("<i", (1 / 0,))', 4)
+        self.assertEqual(cm.exception.args, ('exception', b'', TRACEBACK))
+        self.assertEqual(pb.exec_fast('_b("<i", (1,))', 4), b'\x01\x00\x00\x00')
+
+    def test_resync_after_timeout(self):
+        late = []
+
+        def respond(command):
+            if command.startswith(b'_sample('):
+                # Only part of the reply arrives before the timeout
+                late.append(b'\x00' * 10 + b'\x04\x04>')
+                return b'OKB' + b'\x00' * 590
+            elif command.startswith(b'\x03print("resync'):
+                return late.pop() + reply(command[8:-2] + b'\r\n')
+            else:
+                return reply(b'25.5\r\n')
+
+        pb = make_pyboard(respond)
+        with self.assertRaises(PyboardError):
+            pb.exec_fast('_sample(f, 100, 1)', 600, timeout=0.01)
+        self.assertEqual(pb.exec_fast('print(hub.battery.temperature())'), b'25.5\r\n')
+
+    def test_resync_fails_pending(self):
+        def respond(command):
+            if command == b'bad()':
+                return b'XX'
+            elif command.startswith(b'\x03print("resync'):
+                return reply(command[8:-2] + b'\r\n')
+            else:
+                return reply()
+
+        pb = make_pyboard(respond)
+        future = Future()
+        pb.exec_nowait('bad()')
+        pb.exec_nowait('good()', future=future)
+        with self.assertRaises(PyboardError):
+            pb.sync()
+        self.assertIsInstance(future.exception(0), PyboardError)
+        self.assertEqual(pb.exec_fast('good()'), b'')
+
+
+class WriteDelayTest(unittest.TestCase):
+    def test_flush_at_exit(self):
+        written = []
+        pb = make_pyboard(lambda command: written.append(command) or reply())
+        pb._write_delay = 60
+        pb.exec_nowait('hub.port.A.motor.pwm(50)')
+        self.assertEqual(written, [])
+        _flush_at_exit(weakref.ref(pb))
+        self.assertEqual(written, [b'hub.port.A.motor.pwm(50)'])
+
+
+if __name__ == '__main__':
+    unittest.main()